@@ -1,14 +1,31 @@
 from flask import Flask, request, jsonify, g
+from flask.json.provider import JSONProvider, DefaultJSONProvider
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from flask_caching import Cache
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Callable
-import os, jwt
+import os, time, importlib, jwt, orjson
+from jwt.algorithms import HMACAlgorithm
 
 from mysql_helper import MySqlHelper  # 你的封装类，需提供 execute_query / execute_non_query
+from movie_summary import create_summary_tables, refresh_summaries
 
 # ========== Flask & CORS ==========
+class ORJSONProvider(JSONProvider):
+    """用 orjson（C 实现）替换 Flask 默认的 json 序列化；orjson 不认识的类型（如 Decimal）沿用 Flask 的转换规则"""
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=DefaultJSONProvider.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)
 
 # ========== 配置 ==========
@@ -17,6 +34,16 @@ JWT_SECRET = os.environ.get("JWT_SECRET", "dev-secret-change-me")
 JWT_ALG = "HS256"
 JWT_EXPIRE_HOURS = 24
 
+# 管理员邮箱白名单（逗号分隔），只有这些账号能调用缓存清理等管理接口
+ADMIN_EMAILS = {e.strip().lower() for e in os.environ.get("ADMIN_EMAILS", "").split(",") if e.strip()}
+
+# MySQL 驱动：默认 mysqlclient（MySQLdb，C 实现，单次调用比纯 Python 的 PyMySQL 快）；
+# 设置 DB_DRIVER=pymysql 可切回 PyMySQL
+DB_DRIVER_NAME = os.environ.get("DB_DRIVER", "MySQLdb")
+DB_DRIVER = importlib.import_module(DB_DRIVER_NAME)
+# mysqlclient 的 MySQLdb 包不会在 import 时加载 cursors 子模块，需要显式导入
+importlib.import_module(f"{DB_DRIVER_NAME}.cursors")
+
 # MySQL（可用环境变量覆盖；与你现在的 testdb 一致）
 DB_CONFIG = {
     "host": os.environ.get("DB_HOST", "127.0.0.1"),
@@ -25,25 +52,103 @@ DB_CONFIG = {
     "password": os.environ.get("DB_PASSWORD", "12345678"),
     "database": os.environ.get("DB_NAME", "testdb"),
     "charset": "utf8mb4",
-    "cursorclass": __import__("pymysql").cursors.DictCursor,
+    "cursorclass": DB_DRIVER.cursors.DictCursor,
 }
 
+# Redis 缓存（电影统计接口用；数据变化少，默认缓存 300 秒）
+CACHE_CONFIG = {
+    "CACHE_TYPE": "RedisCache",
+    "CACHE_REDIS_HOST": os.environ.get("REDIS_HOST", "127.0.0.1"),
+    "CACHE_REDIS_PORT": int(os.environ.get("REDIS_PORT", "6379")),
+    "CACHE_DEFAULT_TIMEOUT": int(os.environ.get("CACHE_TIMEOUT", "300")),
+}
+MOVIE_STATS_ENDPOINTS = ("movies_by_year", "movies_by_genre", "movies_by_country")
+# 响应格式变化时递增版本号，旧格式的缓存自然不会再被读到（v2：按列返回数组）
+MOVIE_STATS_CACHE_VERSION = "v2"
+MOVIE_STATS_CACHE_KEYS = tuple(f"{name}:{MOVIE_STATS_CACHE_VERSION}" for name in MOVIE_STATS_ENDPOINTS)
+
+# 浏览器端缓存（秒）：对这些 GET 接口返回 ETag + Cache-Control，命中 If-None-Match 时回 304
+HTTP_CACHE_MAX_AGE = int(os.environ.get("HTTP_CACHE_MAX_AGE", "300"))
+HTTP_CACHED_ENDPOINTS = set(MOVIE_STATS_ENDPOINTS)
+
+# ========== 缓存实例 ==========
+cache = Cache(app, config=CACHE_CONFIG)
+
+def invalidate_movie_stats_cache() -> None:
+    """清空电影统计缓存；douban_movies 及其关联表有写入后调用"""
+    cache.delete_many(*MOVIE_STATS_CACHE_KEYS)
+
 # ========== DB 实例 ==========
-db = MySqlHelper(**DB_CONFIG)
+db = MySqlHelper(driver=DB_DRIVER, **DB_CONFIG)
+
+# ========== 汇总表刷新（命令行） ==========
+# 不在 Web 进程里定时刷新（每个 gunicorn worker 都会跑一份）；由 cron 定时调用，例如每 10 分钟：
+#   */10 * * * * cd /path/to/backend && flask --app app refresh-summaries
+# 汇总表不存在时会先建表（IF NOT EXISTS，可重复执行），升级后的库第一次运行即可补齐
+@app.cli.command("refresh-summaries")
+def refresh_summaries_command():
+    """建好（如缺失）并重算电影统计汇总表，然后清空统计缓存"""
+    create_summary_tables(db)
+    if not refresh_summaries(db):
+        print("另一个刷新任务正在运行，本次跳过")
+        return
+    invalidate_movie_stats_cache()
+    print("电影统计汇总表已刷新！")
+
+# ========== 密码工具 ==========
+# argon2 为 C 实现，哈希期间释放 GIL；旧的 pbkdf2 哈希在下次登录成功时自动升级
+ph = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=1)
+# 哈希是 CPU 密集操作（每次约 64 MiB 内存）：放到有界线程池里。线程池是每个进程一份，
+# 多进程部署时用 PWD_HASH_WORKERS 控制单进程线程数（gunicorn.conf.py 会按 CPU 核数 / worker 数设置）；
+# 不设置时（单进程开发服务器）等于 CPU 核数
+PWD_HASH_WORKERS = int(os.environ.get("PWD_HASH_WORKERS", str(os.cpu_count() or 1)))
+_pwd_pool = ThreadPoolExecutor(max_workers=PWD_HASH_WORKERS, thread_name_prefix="pwd-hash")
+
+def hash_password(password: str) -> str:
+    return ph.hash(password)
+
+def verify_password(pwd_hash: str, password: str) -> tuple[bool, Optional[str]]:
+    """校验密码；返回 (是否通过, 需要写回的新哈希或 None)"""
+    if pwd_hash.startswith("pbkdf2:"):
+        if not check_password_hash(pwd_hash, password):
+            return False, None
+        return True, hash_password(password)
+    try:
+        ph.verify(pwd_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False, None
+    if ph.check_needs_rehash(pwd_hash):
+        return True, hash_password(password)
+    return True, None
 
 # ========== JWT 工具 ==========
+# 编解码器与 HMAC 密钥只在启动时准备一次，签发/校验时直接复用
+# 注：HS256 走标准库 hmac + hashlib，底层已是 OpenSSL 的 C 实现，不需要额外安装 pyjwt[crypto]（那只用于 RS/ES 算法）
+_jwt = jwt.PyJWT()
+_jwt_key = HMACAlgorithm(HMACAlgorithm.SHA256).prepare_key(JWT_SECRET)
+
 def create_jwt(payload: dict) -> str:
-    exp = datetime.utcnow() + timedelta(hours=JWT_EXPIRE_HOURS)
+    exp = int(time.time()) + JWT_EXPIRE_HOURS * 3600
     data = {**payload, "exp": exp}
-    return jwt.encode(data, JWT_SECRET, algorithm=JWT_ALG)
+    return _jwt.encode(data, _jwt_key, algorithm=JWT_ALG)
+
+@lru_cache(maxsize=4096)
+def _decode_jwt_cached(token: str) -> dict:
+    # 同一个 token 只做一次 HMAC 校验；校验失败会抛异常，不会进缓存
+    # require exp：没有 exp 的 token 直接判为无效，下面的过期检查才能放心取 payload["exp"]
+    return _jwt.decode(token, _jwt_key, algorithms=[JWT_ALG], options={"require": ["exp"]})
 
 def decode_jwt(token: str) -> Optional[dict]:
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
+        payload = _decode_jwt_cached(token)
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    # 命中缓存时不会重新校验 exp，这里手动检查过期
+    if payload["exp"] <= time.time():
+        return None
+    return payload
 
 def get_token_from_header() -> Optional[str]:
     auth = request.headers.get("Authorization", "")
@@ -64,6 +169,32 @@ def require_auth(fn: Callable):
         return fn(*args, **kwargs)
     return wrapper
 
+def require_admin(fn: Callable):
+    """管理员鉴权装饰器：放在 require_auth 之后，只放行 ADMIN_EMAILS 里的账号"""
+    from functools import wraps
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if g.user.get("email") not in ADMIN_EMAILS:
+            return jsonify({"error": "forbidden"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+# ========== HTTP 缓存头 ==========
+@app.after_request
+def add_http_cache_headers(response):
+    if (
+        request.method != "GET"
+        or request.endpoint not in HTTP_CACHED_ENDPOINTS
+        or response.status_code != 200
+        or response.is_streamed
+    ):
+        return response
+    # 这些接口需要登录：只允许浏览器缓存（private），不允许 CDN/代理共享缓存
+    response.headers["Cache-Control"] = f"private, max-age={HTTP_CACHE_MAX_AGE}"
+    response.vary.add("Authorization")
+    response.add_etag()
+    return response.make_conditional(request)
+
 # ========== 健康检查 ==========
 @app.get("/health")
 def health():
@@ -82,11 +213,11 @@ def register():
         return jsonify({"error": "email and password required"}), 400
 
     # 已存在？
-    rows = db.execute_query("SELECT id FROM users WHERE email=%s", (email,))
-    if rows:
+    row = db.execute_one("SELECT id FROM users WHERE email=%s LIMIT 1", (email,))
+    if row:
         return jsonify({"error": "email already exists"}), 409
 
-    pwd_hash = generate_password_hash(password, method="pbkdf2:sha256", salt_length=16)
+    pwd_hash = _pwd_pool.submit(hash_password, password).result()
 
     # 关键：把 username 一起写入
     db.execute_non_query(
@@ -103,11 +234,19 @@ def login():
     if not email or not password:
         return jsonify({"error": "email and password required"}), 400
 
-    rows = db.execute_query("SELECT id, password_hash FROM users WHERE email=%s", (email,))
-    if not rows or not check_password_hash(rows[0]["password_hash"], password):
+    row = db.execute_one("SELECT id, password_hash FROM users WHERE email=%s LIMIT 1", (email,))
+    if not row:
+        return jsonify({"error": "invalid credentials"}), 401
+    ok, new_hash = _pwd_pool.submit(verify_password, row["password_hash"], password).result()
+    if not ok:
         return jsonify({"error": "invalid credentials"}), 401
+    if new_hash:
+        db.execute_non_query(
+            "UPDATE users SET password_hash=%s WHERE id=%s",
+            (new_hash, row["id"]),
+        )
 
-    token = create_jwt({"uid": rows[0]["id"], "email": email})
+    token = create_jwt({"uid": row["id"], "email": email})
     return jsonify({"token": token})
 
 @app.get("/api/me")
@@ -130,52 +269,66 @@ def echo2():
 
 
 # ========== 真实数据接口：与前端路径一一对应 ==========
+# 统计接口按列返回（每个字段一个数组），ECharts 可直接用作 xAxis / series 数据
 # 1) 按年份统计（折线图）
 @app.get("/api/movies/by-year")
 @require_auth
+@cache.cached(key_prefix=f"movies_by_year:{MOVIE_STATS_CACHE_VERSION}")
 def movies_by_year():
+    # 数据来自汇总表 movies_year_summary（见 movie_summary.py）
     sql = """
-        SELECT year AS year, COUNT(*) AS cnt
-        FROM douban_movies
-        WHERE year IS NOT NULL
-        GROUP BY year
+        SELECT year, cnt
+        FROM movies_year_summary
         ORDER BY year
     """
-    rows = db.execute_query(sql)
-    return jsonify(rows)
+    cols = db.execute_query_columns(sql)
+    return jsonify({"years": cols["year"], "cnts": cols["cnt"]})
 
 # 2) 按类型占比（饼图）
 @app.get("/api/movies/by-genre")
 @require_auth
+@cache.cached(key_prefix=f"movies_by_genre:{MOVIE_STATS_CACHE_VERSION}")
 def movies_by_genre():
-    # 依赖：douban_movie_genre(movie_id, genre_id)，douban_genre(id, name)
+    # 数据来自汇总表 movies_genre_summary（由 douban_movie_genre + douban_genre 汇总）
     sql = """
-        SELECT g.name AS name, COUNT(*) AS cnt
-        FROM douban_movie_genre mg
-        JOIN douban_genre g ON mg.genre_id = g.id
-        GROUP BY g.id, g.name
+        SELECT name, cnt
+        FROM movies_genre_summary
         ORDER BY cnt DESC
     """
-    rows = db.execute_query(sql)
-    return jsonify(rows)
+    cols = db.execute_query_columns(sql)
+    return jsonify({"names": cols["name"], "cnts": cols["cnt"]})
 
 # 3) 按国家占比（饼图）
 @app.get("/api/movies/by-country")
 @require_auth
+@cache.cached(key_prefix=f"movies_by_country:{MOVIE_STATS_CACHE_VERSION}")
 def movies_by_country():
-    # 依赖：douban_movie_country(movie_id, country_id)，douban_country(id, name)
+    # 数据来自汇总表 movies_country_summary（由 douban_movie_country + douban_country 汇总）
     sql = """
-        SELECT c.name AS name, COUNT(*) AS cnt
-        FROM douban_movie_country mc
-        JOIN douban_country c ON mc.country_id = c.id
-        GROUP BY c.id, c.name
+        SELECT name, cnt
+        FROM movies_country_summary
         ORDER BY cnt DESC
     """
-    rows = db.execute_query(sql)
-    return jsonify(rows)
+    cols = db.execute_query_columns(sql)
+    return jsonify({"names": cols["name"], "cnts": cols["cnt"]})
+
+# 4) 手动清空统计缓存（导入/修改电影数据后调用；仅管理员）
+@app.post("/api/cache/invalidate")
+@require_auth
+@require_admin
+def cache_invalidate():
+    invalidate_movie_stats_cache()
+    return jsonify({"message": "ok"})
 
 
 # ========== 入口 ==========
+# 生产环境用 gunicorn 启动（配置见 gunicorn.conf.py）：gunicorn app:app
+# 下面只用于本地开发；需要调试模式时设置 FLASK_DEBUG=1
 if __name__ == "__main__":
     # 前端 package.json 里有 "proxy": "http://127.0.0.1:5000"
-    app.run(host="127.0.0.1", port=int(os.environ.get("PORT", "5000")), debug=True)
\ No newline at end of file
+    app.run(
+        host="127.0.0.1",
+        port=int(os.environ.get("PORT", "5000")),
+        debug=os.environ.get("FLASK_DEBUG") == "1",
+        threaded=True,
+    )
\ No newline at end of file
@@ -0,0 +1,25 @@
+# gunicorn 生产环境配置：在 backend 目录下运行 `gunicorn app:app`（会自动读取本文件）
+# 开发自测仍可直接 `python app.py`
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# gthread：每个 worker 进程内多线程处理请求，等待 MySQL / Redis 的请求可以并行
+# 不用 gevent：mysqlclient 是 C 扩展，不能被 gevent 协程化；密码哈希线程池也需要真实线程
+worker_class = "gthread"
+workers = int(os.environ.get("GUNICORN_WORKERS", "4"))
+# 每个 worker 有自己的连接池（MySqlHelper maxconnections=20），线程数不要超过它
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+
+timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    # 密码哈希线程池每个 worker 一份：按实际 worker 数（含命令行 -w 覆盖）分摊 CPU 核数，
+    # 每个 worker 至少 1 个线程，整机同时进行的 argon2 哈希约等于核数。
+    # 在 fork 出的子进程里、加载 app 之前设置；显式设置了 PWD_HASH_WORKERS 时不覆盖。
+    # 注意：开启 preload_app 时 app 在 fork 前已加载，这里的设置不会生效。
+    if "PWD_HASH_WORKERS" not in os.environ:
+        os.environ["PWD_HASH_WORKERS"] = str(max(1, (os.cpu_count() or 1) // server.cfg.workers))
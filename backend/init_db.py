@@ -1,4 +1,7 @@
+import os, importlib
+
 from mysql_helper import MySqlHelper
+from movie_summary import create_summary_tables, ensure_source_indexes, refresh_summaries
 
 config = {
     'host': '127.0.0.1',
@@ -8,7 +11,13 @@ config = {
     'charset': 'utf8mb4'
 }
 
-db = MySqlHelper(**config)
+# 与 app.py 使用同一个驱动：默认 mysqlclient（MySQLdb），DB_DRIVER=pymysql 可切回 PyMySQL
+DB_DRIVER_NAME = os.environ.get("DB_DRIVER", "MySQLdb")
+DB_DRIVER = importlib.import_module(DB_DRIVER_NAME)
+# mysqlclient 的 MySQLdb 包不会在 import 时加载 cursors 子模块，需要显式导入
+importlib.import_module(f"{DB_DRIVER_NAME}.cursors")
+
+db = MySqlHelper(driver=DB_DRIVER, **config)
 create_sql = """
 CREATE TABLE IF NOT EXISTS users (
   id INT AUTO_INCREMENT PRIMARY KEY,
@@ -18,4 +27,9 @@ CREATE TABLE IF NOT EXISTS users (
 )
 """
 db.execute_non_query(create_sql)
-print("用户表已创建！")
\ No newline at end of file
+print("用户表已创建！")
+
+ensure_source_indexes(db)
+create_summary_tables(db)
+refresh_summaries(db)
+print("电影统计汇总表已创建并刷新！")
\ No newline at end of file
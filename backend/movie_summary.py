@@ -0,0 +1,142 @@
+"""
+Movie Summary Module
+
+Pre-aggregated statistics tables for the /api/movies/* endpoints. The
+GROUP BY work over douban_movies and its join tables is done once per
+refresh instead of once per request; the endpoints only read the small
+summary tables.
+"""
+
+from mysql_helper import MySqlHelper
+
+# ========== 汇总表 DDL ==========
+SUMMARY_TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS movies_year_summary (
+      year INT PRIMARY KEY,
+      cnt INT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS movies_genre_summary (
+      genre_id INT PRIMARY KEY,
+      name VARCHAR(255) NOT NULL,
+      cnt INT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS movies_country_summary (
+      country_id INT PRIMARY KEY,
+      name VARCHAR(255) NOT NULL,
+      cnt INT NOT NULL
+    )
+    """,
+]
+
+# ========== 源表索引 ==========
+# (索引名, 表名, 列)；让刷新时的 GROUP BY 走覆盖索引（EXPLAIN 里出现 "Using index for group-by"/"Using index"），
+# 不用回表、不建临时表排序
+SOURCE_INDEXES = [
+    ("idx_movies_year", "douban_movies", "year"),
+    ("idx_mg_genre", "douban_movie_genre", "genre_id, movie_id"),
+    ("idx_mc_country", "douban_movie_country", "country_id, movie_id"),
+]
+
+# ========== 刷新语句 ==========
+REFRESH_LOCK_NAME = "movie_summaries"
+
+# 先 upsert 最新计数，再删掉源表里已经不存在的分组；
+# 删除条件用与 upsert 相同的 JOIN + NOT EXISTS（NOT IN 遇到 NULL 会整体失效）
+REFRESH_SQL = [
+    """
+    INSERT INTO movies_year_summary (year, cnt)
+    SELECT year, COUNT(*)
+    FROM douban_movies
+    WHERE year IS NOT NULL
+    GROUP BY year
+    ON DUPLICATE KEY UPDATE cnt = VALUES(cnt)
+    """,
+    """
+    DELETE FROM movies_year_summary
+    WHERE NOT EXISTS (
+      SELECT 1 FROM douban_movies m
+      WHERE m.year = movies_year_summary.year
+    )
+    """,
+    """
+    INSERT INTO movies_genre_summary (genre_id, name, cnt)
+    SELECT g.id, g.name, COUNT(*)
+    FROM douban_movie_genre mg
+    JOIN douban_genre g ON mg.genre_id = g.id
+    GROUP BY g.id, g.name
+    ON DUPLICATE KEY UPDATE name = VALUES(name), cnt = VALUES(cnt)
+    """,
+    """
+    DELETE FROM movies_genre_summary
+    WHERE NOT EXISTS (
+      SELECT 1
+      FROM douban_movie_genre mg
+      JOIN douban_genre g ON mg.genre_id = g.id
+      WHERE g.id = movies_genre_summary.genre_id
+    )
+    """,
+    """
+    INSERT INTO movies_country_summary (country_id, name, cnt)
+    SELECT c.id, c.name, COUNT(*)
+    FROM douban_movie_country mc
+    JOIN douban_country c ON mc.country_id = c.id
+    GROUP BY c.id, c.name
+    ON DUPLICATE KEY UPDATE name = VALUES(name), cnt = VALUES(cnt)
+    """,
+    """
+    DELETE FROM movies_country_summary
+    WHERE NOT EXISTS (
+      SELECT 1
+      FROM douban_movie_country mc
+      JOIN douban_country c ON mc.country_id = c.id
+      WHERE c.id = movies_country_summary.country_id
+    )
+    """,
+]
+
+
+def create_summary_tables(db: MySqlHelper) -> None:
+    """创建三张汇总表（已存在则跳过）"""
+    for sql in SUMMARY_TABLES_SQL:
+        db.execute_non_query(sql)
+
+
+def ensure_source_indexes(db: MySqlHelper) -> None:
+    """
+    给源表补上汇总用的索引（已存在则跳过）。
+    MySQL 不支持 CREATE INDEX IF NOT EXISTS，所以先查 information_schema.STATISTICS。
+    """
+    for index_name, table_name, columns in SOURCE_INDEXES:
+        exists = db.execute_one(
+            """
+            SELECT 1
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = %s
+              AND TABLE_NAME = %s
+              AND INDEX_NAME = %s
+            LIMIT 1
+            """,
+            (db.database, table_name, index_name),
+        )
+        if exists is None:
+            db.execute_non_query(f"CREATE INDEX `{index_name}` ON `{table_name}` ({columns})")
+
+
+def refresh_summaries(db: MySqlHelper) -> bool:
+    """
+    按源表重新计算汇总数据；定时任务或导入数据（ETL）后调用。
+    用 MySQL 命名锁保证同一时间只有一个刷新在跑（并发的 upsert/delete 容易死锁），
+    拿不到锁直接返回 False；所有语句在同一个事务里提交，读者看不到刷新到一半的数据。
+    """
+    # 锁在 COMMIT 之后才释放，下一个刷新不会在本次提交前开始
+    with db.locked_transaction(REFRESH_LOCK_NAME) as cur:
+        if cur is None:
+            return False
+        for sql in REFRESH_SQL:
+            cur.execute(sql)
+    return True
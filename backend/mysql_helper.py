@@ -2,14 +2,21 @@
 MySQL Helper Module
 
 This module provides a high-level interface for interacting with MySQL databases
-using PyMySQL. It simplifies common database operations and handles connections
-safely.
+using PyMySQL or any DB-API compatible driver with the same cursor classes (such
+as mysqlclient / MySQLdb). It simplifies common database operations and handles
+connections safely through a thread-safe DBUtils connection pool.
 """
 
-import pymysql # 导入pymysql库：MySQL数据库连接库
-from typing import List, Dict, Any, Optional, Union, Tuple
+import pymysql # 导入pymysql库：MySQL数据库连接库（默认驱动）
+from dbutils.pooled_db import PooledDB # 导入DBUtils连接池：多线程复用连接
+from typing import List, Dict, Any, Optional, Union, Tuple, Iterator
 import logging
+import os
+import time
+import sqlparse # 导入sqlparse库：SQL 脚本切分
+from sqlparse import tokens as sql_tokens
 from contextlib import contextmanager
+from functools import lru_cache
 
 # Set up logging
 logging.basicConfig(
@@ -19,9 +26,37 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _is_plain_comment(token) -> bool:
+    """普通注释；/*! ... */ 是 MySQL 条件注释（mysqldump 里的 SET NAMES 等），要当作语句保留"""
+    return token.ttype in sql_tokens.Comment and not token.value.startswith("/*!")
+
+
+@lru_cache(maxsize=32)
+def _split_sql(sql_text: str) -> Tuple[str, ...]:
+    """按分号切分成语句，丢掉只有注释的片段；同一段脚本只解析一次"""
+    # 整行 # 注释先去掉：sqlparse 只认 "# " 开头，"#note;" 会被当成语句切开
+    lines = [line for line in sql_text.splitlines() if not line.lstrip().startswith("#")]
+    statements = []
+    for stmt in sqlparse.split("\n".join(lines)):
+        tokens = list(sqlparse.parse(stmt)[0].flatten())
+        keep = [i for i, t in enumerate(tokens) if not t.is_whitespace and not _is_plain_comment(t)]
+        if not keep or all(tokens[i].value == ";" for i in keep):
+            continue
+        # 去掉末尾分号后面的注释（开头的注释 MySQL 可以接受）
+        statements.append("".join(t.value for t in tokens[:keep[-1] + 1]).strip())
+    return tuple(statements)
+
+
+@lru_cache(maxsize=32)
+def _load_sql_file(path: str, mtime: float) -> Tuple[str, ...]:
+    """读取并切分脚本文件；以修改时间作为缓存键，文件改动后自动重新解析"""
+    with open(path, encoding="utf-8") as f:
+        return _split_sql(f.read())
+
+
 class MySqlHelper:
     """
-    A helper class for MySQL database operations using PyMySQL.
+    A helper class for MySQL database operations using PyMySQL or mysqlclient.
     
     This class provides a simplified interface for common database operations
     including executing queries, non-queries, and batch operations with proper
@@ -62,7 +97,7 @@ class MySqlHelper:
             raise
             
         finally:
-            # Always close the connection
+            # Always close the pool
             db.close()
     """
     
@@ -73,10 +108,15 @@ class MySqlHelper:
         password: str,
         database: str,
         port: int = 3306,
+        mincached: int = 2,
+        maxcached: int = 10,
+        maxconnections: int = 20,
+        table_cache_ttl: float = 30,
+        driver: Any = pymysql,
         **kwargs
     ) -> None:
         """
-        Initialize the MySQL helper with connection parameters.
+        Initialize the MySQL helper and its connection pool.
         
         Args:
             host: Database host address
@@ -84,47 +124,82 @@ class MySqlHelper:
             password: Database password
             database: Database name
             port: Database port (default: 3306)
-            **kwargs: Additional connection parameters for PyMySQL
+            mincached: Idle connections opened at startup (default: 2)
+            maxcached: Maximum idle connections kept in the pool (default: 10)
+            maxconnections: Maximum connections allowed in total (default: 20)
+            table_cache_ttl: Seconds the table list used by table_exists is cached (default: 30)
+            driver: DB-API driver module used to open connections (default: pymysql).
+                Pass ``MySQLdb`` (mysqlclient) to use the C client library.
+            **kwargs: Additional connection parameters for the driver.
+                Connections use ``autocommit=True`` unless overridden here.
+        
+        Raises:
+            driver.Error: If the initial pooled connections cannot be opened
         """
         self.host = host
         self.port = port
         self.user = user
         self.password = password
         self.database = database
+        # 默认 autocommit：单条语句本身就是原子的，不需要额外的 BEGIN/COMMIT 往返；
+        # 多条语句要一起提交时用 transaction()
+        kwargs.setdefault("autocommit", True)
         self.connection_params = kwargs
-        self.connection = None
+        self.autocommit = kwargs["autocommit"]
+        self.driver = driver
+        self.table_cache_ttl = table_cache_ttl
+        # schema -> (加载时间, 表名集合)
+        self._table_cache: Dict[str, Tuple[float, set]] = {}
+        try:
+            # blocking=True：池满时等待空闲连接，而不是直接抛错
+            # reset：autocommit 连接归还时没有未结束的事务，不必每次都发 ROLLBACK
+            self.pool = PooledDB(
+                creator=self.driver,
+                mincached=mincached,
+                maxcached=maxcached,
+                maxconnections=maxconnections,
+                blocking=True,
+                reset=not self.autocommit,
+                host=self.host,
+                port=self.port,
+                user=self.user,
+                password=self.password,
+                database=self.database,
+                **self.connection_params
+            )
+            logger.info(f"Connection pool to MySQL database at {self.host} created")
+        except self.driver.Error as e:
+            logger.error(f"Failed to connect to MySQL: {e}")
+            raise
     
     def _get_connection(self):
         """
-        Get a database connection, creating a new one if necessary.
+        Borrow a connection from the pool.
+        
+        The returned connection must be closed by the caller; closing it
+        hands it back to the pool instead of dropping the socket.
         
         Returns:
-            A PyMySQL connection object
+            A pooled connection object of the configured driver
             
         Raises:
-            pymysql.Error: If connection fails
+            driver.Error: If connection fails
         """
-        if self.connection is None or not self.connection.open:
-            try:
-                self.connection = pymysql.connect(
-                    host=self.host,
-                    port=self.port,
-                    user=self.user,
-                    password=self.password,
-                    database=self.database,
-                    # cursorclass=pymysql.cursors.DictCursor,
-                    **self.connection_params
-                )
-                logger.info(f"Connected to MySQL database at {self.host}")
-            except pymysql.Error as e:
-                logger.error(f"Failed to connect to MySQL: {e}")
-                raise
-        return self.connection
+        return self.pool.connection()
     
     @contextmanager
-    def _get_cursor(self):
+    def _get_cursor(self, cursorclass: Any = None, readonly: bool = False):
         """
-        A context manager for handling database cursors.
+        A context manager for handling database cursors for a single statement.
+        
+        On autocommit connections (the default) each statement commits by
+        itself, so no COMMIT/ROLLBACK is sent. With ``autocommit=False`` writes
+        are committed on success and rolled back on error; ``readonly=True``
+        skips the COMMIT for pure SELECT statements.
+        
+        Args:
+            cursorclass: Cursor class to use instead of the connection default
+            readonly: Skip COMMIT for pure SELECT statements
         
         Yields:
             A database cursor
@@ -137,12 +212,98 @@ class MySqlHelper:
         conn = self._get_connection()
         cursor = None
         try:
-            cursor = conn.cursor()
+            cursor = conn.cursor(cursorclass) if cursorclass else conn.cursor()
+            yield cursor
+            if not readonly and not self.autocommit:
+                conn.commit()
+        except Exception as e:
+            if not self.autocommit:
+                conn.rollback()
+            logger.error(f"Database operation failed: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+            conn.close()  # 归还连接池
+    
+    @contextmanager
+    def transaction(self, cursorclass: Any = None):
+        """
+        A context manager running several statements in one transaction.
+        
+        All statements share one pooled connection; they are committed
+        together on success and rolled back together on error.
+        
+        Args:
+            cursorclass: Cursor class to use instead of the connection default
+        
+        Yields:
+            A database cursor
+            
+        Example:
+            with db.transaction() as cursor:
+                cursor.execute("UPDATE accounts SET balance = balance - %s WHERE id = %s", (10, 1))
+                cursor.execute("UPDATE accounts SET balance = balance + %s WHERE id = %s", (10, 2))
+        """
+        conn = self._get_connection()
+        try:
+            with self._transaction_cursor(conn, cursorclass) as cursor:
+                yield cursor
+        finally:
+            conn.close()  # 归还连接池
+    
+    @contextmanager
+    def locked_transaction(self, lock_name: str, cursorclass: Any = None):
+        """
+        A context manager running a transaction while holding a MySQL named lock.
+        
+        ``GET_LOCK(lock_name, 0)`` is taken on the same pooled connection
+        before ``BEGIN`` and released only after ``COMMIT``/``ROLLBACK``, so
+        no other holder of the lock can start while this transaction is
+        still uncommitted. If the lock is held elsewhere, yields None
+        without running anything.
+        
+        Args:
+            lock_name: Name passed to GET_LOCK / RELEASE_LOCK
+            cursorclass: Cursor class to use instead of the connection default
+        
+        Yields:
+            A database cursor, or None if the lock was not acquired
+            
+        Example:
+            with db.locked_transaction("nightly_job") as cursor:
+                if cursor is None:
+                    return  # another run is in progress
+                cursor.execute("DELETE FROM stats")
+        """
+        conn = self._get_connection()
+        lock_cursor = conn.cursor(self.driver.cursors.Cursor)
+        try:
+            lock_cursor.execute("SELECT GET_LOCK(%s, 0)", (lock_name,))
+            if lock_cursor.fetchone()[0] != 1:
+                yield None
+                return
+            try:
+                with self._transaction_cursor(conn, cursorclass) as cursor:
+                    yield cursor
+            finally:
+                lock_cursor.execute("SELECT RELEASE_LOCK(%s)", (lock_name,))
+        finally:
+            lock_cursor.close()
+            conn.close()  # 归还连接池
+    
+    @contextmanager
+    def _transaction_cursor(self, conn, cursorclass: Any = None):
+        """在给定连接上执行 BEGIN … COMMIT（出错 ROLLBACK），不负责归还连接"""
+        cursor = None
+        try:
+            conn.begin()
+            cursor = conn.cursor(cursorclass) if cursorclass else conn.cursor()
             yield cursor
             conn.commit()
         except Exception as e:
             conn.rollback()
-            logger.error(f"Database operation failed: {e}")
+            logger.error(f"Transaction failed: {e}")
             raise
         finally:
             if cursor:
@@ -157,54 +318,61 @@ class MySqlHelper:
         # 用当前连接直接执行即可
         self.execute_non_query(sql)
     
+    def _cached_tables(self, schema: str) -> Optional[set]:
+        """返回 schema 下仍在有效期内的表名缓存；没有或已过期返回 None"""
+        cached = self._table_cache.get(schema)
+        if cached is None or time.monotonic() - cached[0] > self.table_cache_ttl:
+            return None
+        return cached[1]
+    
     def table_exists(self, table_name: str, schema: Optional[str] = None) -> bool:
         """
         判断表是否存在。schema 不传则使用当前连接的 database。
+        表名列表按 schema 缓存 table_cache_ttl 秒，缓存有效期内只是一次集合查找。
         """
-        with self._get_cursor() as cur:
-            cur.execute(
-            """
-            SELECT 1
-            FROM information_schema.TABLES
-            WHERE TABLE_SCHEMA = COALESCE(%s, DATABASE())
-              AND TABLE_NAME = %s
-            LIMIT 1
-            """,
-            (schema, table_name),
-        )
-        return cur.fetchone() is not None
+        # 在 Python 里确定 schema 再当常量绑定：MySQL 直接按 TABLE_SCHEMA 定位，不用在扫描时求值 DATABASE()
+        schema = schema or self.database
+        names = self._cached_tables(schema)
+        if names is None:
+            rows = self.execute_query(
+                """
+                SELECT TABLE_NAME AS name
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = %s
+                """,
+                (schema,),
+            )
+            # 兼容 DictCursor 与默认的元组游标
+            names = {row["name"] if isinstance(row, dict) else row[0] for row in rows}
+            self._table_cache[schema] = (time.monotonic(), names)
+        return table_name in names
     
     def ensure_table(self, create_table_sql: str, table_name: Optional[str] = None, schema: Optional[str] = None) -> None:
         """
-        确保表存在：不存在则执行给定的 CREATE TABLE 语句。
-        - 如果提供 table_name，会先用 information_schema 检查是否已存在；存在则不执行，避免无意义 DDL。
-        - 如果不传 table_name（比如 SQL 很复杂），直接执行 CREATE TABLE IF NOT EXISTS 语句。
+        确保表存在：直接执行给定的 CREATE TABLE 语句（请自带 IF NOT EXISTS），一次往返。
+        不再先查 information_schema，也不依赖表名缓存，表被删掉后也能重新建出来。
+        table_name / schema 仅用于让 table_exists 的缓存失效。
         """
-        if table_name:
-            if self.table_exists(table_name, schema=schema):
-                return
-        # 建议你的 create_table_sql 自带 IF NOT EXISTS，更稳
         self.execute_non_query(create_table_sql)
+        if table_name:
+            self._table_cache.pop(schema or self.database, None)
     
     def run_script(self, sql_text: str) -> None:
         """
-        执行多条语句脚本（以分号分隔）。简单实用版：
-        - 忽略空行与纯注释行（以 -- 或 # 开头）
-        - 不支持存储过程/触发器里包含分号的复杂情况（那种用专门脚本执行器）
-        """
-        statements = []
-        buff = []
-        for line in sql_text.splitlines():
-            l = line.strip()
-            if not l or l.startswith("--") or l.startswith("#"):
-                continue
-            buff.append(line)
-            if l.endswith(";"):
-                statements.append("\n".join(buff))
-                buff = []
-        if buff:
-            statements.append("\n".join(buff))
-        for stmt in statements:
+        执行多条语句脚本（以分号分隔）：
+        - 用 sqlparse 切分，字符串里的分号不会被误切
+        - 忽略只有注释的片段与整行 # 注释；/*! ... */ 条件注释（mysqldump）照常执行
+        - 切分结果按脚本内容缓存，重复执行同一脚本不再重新解析
+        - 不支持改过 DELIMITER 的存储过程/触发器脚本（那种用专门脚本执行器）
+        """
+        for stmt in _split_sql(sql_text):
+            self.execute_non_query(stmt)
+    
+    def run_script_file(self, path: str) -> None:
+        """
+        执行 .sql 脚本文件；文件未修改时直接复用上次的切分结果。
+        """
+        for stmt in _load_sql_file(path, os.path.getmtime(path)):
             self.execute_non_query(stmt)
 
     def execute_query(
@@ -229,13 +397,117 @@ class MySqlHelper:
             )
         """
         try:
-            with self._get_cursor() as cursor:
+            with self._get_cursor(readonly=True) as cursor:
                 cursor.execute(sql, params or ())
                 return cursor.fetchall()
-        except pymysql.Error as e:
+        except self.driver.Error as e:
             logger.error(f"Query failed: {e}\nSQL: {sql}\nParams: {params}")
             raise
     
+    def execute_one(
+        self,
+        sql: str,
+        params: Optional[Union[tuple, dict]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Execute a SELECT query and return only the first row.
+        
+        Intended for lookups that match at most one row; add ``LIMIT 1`` to
+        the SQL so the server can stop as soon as it finds a match.
+        
+        Args:
+            sql: SQL query string with %s placeholders
+            params: Parameters for the query as a tuple or dict
+        
+        Returns:
+            The first row, or None if the query matched nothing
+            
+        Example:
+            user = db.execute_one(
+                "SELECT id, name FROM users WHERE email = %s LIMIT 1",
+                ('john@example.com',)
+            )
+        """
+        try:
+            with self._get_cursor(readonly=True) as cursor:
+                cursor.execute(sql, params or ())
+                return cursor.fetchone()
+        except self.driver.Error as e:
+            logger.error(f"Query failed: {e}\nSQL: {sql}\nParams: {params}")
+            raise
+    
+    def execute_query_columns(
+        self,
+        sql: str,
+        params: Optional[Union[tuple, dict]] = None
+    ) -> Dict[str, List[Any]]:
+        """
+        Execute a SELECT query and return the results column by column.
+        
+        Rows are fetched with a plain tuple cursor (no per-row dict) and
+        transposed with ``zip``, which suits chart libraries that take one
+        array per series.
+        
+        Args:
+            sql: SQL query string with %s placeholders
+            params: Parameters for the query as a tuple or dict
+        
+        Returns:
+            Dictionary mapping each column name to the list of its values
+            
+        Example:
+            cols = db.execute_query_columns("SELECT name, age FROM users")
+            # {'name': ['Alice', 'Bob'], 'age': [30, 25]}
+        """
+        try:
+            with self._get_cursor(self.driver.cursors.Cursor, readonly=True) as cursor:
+                cursor.execute(sql, params or ())
+                rows = cursor.fetchall()
+                names = [col[0] for col in cursor.description]
+        except self.driver.Error as e:
+            logger.error(f"Query failed: {e}\nSQL: {sql}\nParams: {params}")
+            raise
+        columns = list(zip(*rows)) or [()] * len(names)
+        return {name: list(values) for name, values in zip(names, columns)}
+    
+    def execute_query_stream(
+        self,
+        sql: str,
+        params: Optional[Union[tuple, dict]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Execute a SELECT query and yield rows one at a time.
+        
+        Uses an unbuffered server-side cursor (``SSDictCursor``), so the full
+        result set is never held in memory. The pooled connection stays busy
+        until the generator is exhausted or closed, so consume it promptly.
+        
+        Args:
+            sql: SQL query string with %s placeholders
+            params: Parameters for the query as a tuple or dict
+        
+        Yields:
+            One dictionary per row
+            
+        Example:
+            for row in db.execute_query_stream("SELECT * FROM big_table"):
+                process(row)
+        """
+        conn = self._get_connection()
+        cursor = None
+        try:
+            cursor = conn.cursor(self.driver.cursors.SSDictCursor)
+            cursor.execute(sql, params or ())
+            for row in cursor:
+                yield row
+        except self.driver.Error as e:
+            logger.error(f"Query failed: {e}\nSQL: {sql}\nParams: {params}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()  # 未读完的行会在这里丢弃，连接才能复用
+            conn.close()  # 归还连接池
+    
     def execute_non_query(
         self,
         sql: str,
@@ -262,7 +534,7 @@ class MySqlHelper:
                 affected_rows = cursor.execute(sql, params or ())
                 logger.debug(f"Query affected {affected_rows} rows")
                 return affected_rows
-        except pymysql.Error as e:
+        except self.driver.Error as e:
             logger.error(f"Query failed: {e}\nSQL: {sql}\nParams: {params}")
             raise
     
@@ -274,6 +546,11 @@ class MySqlHelper:
         """
         Execute a parameterized query multiple times.
         
+        ``INSERT/REPLACE ... VALUES (...)`` statements are rewritten by the
+        driver into one multi-row statement, which is atomic on its own. Any
+        other SQL runs once per parameter set, so it is wrapped in a
+        transaction to keep the batch all-or-nothing.
+        
         Args:
             sql: SQL statement with %s placeholders
             param_list: List of parameter tuples or dicts
@@ -294,28 +571,73 @@ class MySqlHelper:
         if not param_list:
             return 0
             
+        insert_values = getattr(self.driver.cursors, "RE_INSERT_VALUES", None)
+        rewritable = insert_values is not None and insert_values.match(sql)
         try:
-            with self._get_cursor() as cursor:
+            with (self._get_cursor() if rewritable else self.transaction()) as cursor:
                 affected_rows = cursor.executemany(sql, param_list)
                 logger.debug(f"Batch query affected {affected_rows} rows")
                 return affected_rows
-        except pymysql.Error as e:
+        except self.driver.Error as e:
             logger.error(f"Batch query failed: {e}\nSQL: {sql}")
             raise
     
+    def bulk_insert(
+        self,
+        table: str,
+        columns: List[str],
+        rows: List[Union[tuple, dict]],
+        chunk_size: int = 1000
+    ) -> int:
+        """
+        Insert many rows using multi-row ``INSERT ... VALUES (...), (...)`` batches.
+        
+        The statement is built in the exact form the driver's ``executemany``
+        (both PyMySQL and mysqlclient) rewrites into a single multi-row INSERT,
+        so each chunk costs one round-trip instead of one per row. Each chunk
+        is committed on its own. A chunk longer than the driver's
+        ``max_stmt_length`` (1 MiB in PyMySQL, 64 KiB in mysqlclient) is sent
+        as several statements; lower ``chunk_size`` for very wide rows.
+        
+        Args:
+            table: Target table name
+            columns: Column names, in the same order as the values in each row
+            rows: Row values as tuples (or dicts keyed by column name)
+            chunk_size: Maximum rows sent per statement (default: 1000)
+            
+        Returns:
+            Number of rows affected (total for all chunks)
+            
+        Example:
+            rowcount = db.bulk_insert(
+                "users",
+                ["name", "email"],
+                [('Alice', 'alice@example.com'), ('Bob', 'bob@example.com')]
+            )
+        """
+        if rows and isinstance(rows[0], dict):
+            placeholders = ", ".join(f"%({col})s" for col in columns)
+        else:
+            placeholders = ", ".join(["%s"] * len(columns))
+        col_list = ", ".join(f"`{col}`" for col in columns)
+        sql = f"INSERT INTO `{table}` ({col_list}) VALUES ({placeholders})"
+        
+        total = 0
+        for i in range(0, len(rows), chunk_size):
+            total += self.execute_many(sql, rows[i:i + chunk_size])
+        return total
+    
     def close(self) -> None:
-        """Close the database connection if it's open."""
-        if self.connection and self.connection.open:
-            self.connection.close()
-            self.connection = None
-            logger.info("Database connection closed")
+        """Close all idle connections held by the pool."""
+        self.pool.close()
+        logger.info("Database connection pool closed")
     
     def __enter__(self):
         """Enable usage in a context manager."""
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        """Ensure connection is closed when exiting context."""
+        """Ensure the pool is closed when exiting context."""
         self.close()
 
 
@@ -363,6 +685,13 @@ if __name__ == "__main__":
                 users
             )
             
+            # Bulk insert in chunks (one multi-row INSERT per chunk)
+            db.bulk_insert(
+                "test_users",
+                ["name", "email"],
+                [(f"User {i}", f"user{i}@example.com") for i in range(5000)]
+            )
+            
             # Query the data
             results = db.execute_query("SELECT * FROM test_users")
             print("\nAll users:")
@@ -376,13 +705,13 @@ if __name__ == "__main__":
             )
             
             # Query a single record
-            user = db.execute_query(
-                "SELECT * FROM test_users WHERE email = %s",
+            user = db.execute_one(
+                "SELECT * FROM test_users WHERE email = %s LIMIT 1",
                 ('bob@example.com',)
             )
             if user:
                 print("\nUpdated user:")
-                print(f"ID: {user[0]['id']}, Name: {user[0]['name']}, Email: {user[0]['email']}")
+                print(f"ID: {user['id']}, Name: {user['name']}, Email: {user['email']}")
             
             # Clean up (uncomment to delete the test table when done)
             # db.execute_non_query("DROP TABLE IF EXISTS test_users")
@@ -391,4 +720,4 @@ if __name__ == "__main__":
             print(f"An error occurred: {e}")
             raise
 
-        # 改进方向：语义化包装；连接池
+        # 改进方向：语义化包装